@@ -15,9 +15,13 @@ from .storage import (
     guardar_evento_en_db,
     inicializar_db,
     listar_ciudades_db,
+    listar_eventos_con_id_db,
     listar_eventos_db,
 )
 from .weather import consultar_clima_ciudades
+from .dedup import InformeFusion, deduplicar_db, normalizar_texto
+from .forecast import CachePronosticos, PlanificadorPronosticos, necesidades_pronostico
+from .write_behind import EventStoreWriteBehind, MutacionDescartada
 
 __all__ = [
     "Ciudad",
@@ -34,6 +38,15 @@ __all__ = [
     "guardar_evento_en_db",
     "inicializar_db",
     "listar_ciudades_db",
+    "listar_eventos_con_id_db",
     "listar_eventos_db",
     "consultar_clima_ciudades",
+    "CachePronosticos",
+    "InformeFusion",
+    "deduplicar_db",
+    "normalizar_texto",
+    "PlanificadorPronosticos",
+    "necesidades_pronostico",
+    "EventStoreWriteBehind",
+    "MutacionDescartada",
 ]
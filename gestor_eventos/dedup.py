@@ -0,0 +1,336 @@
+"""Detección y fusión de ciudades y eventos duplicados en la base de datos."""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .storage import RUTA_DB
+
+_BASE32_GEOHASH = "0123456789bcdefghjkmnpqrstuvwxyz"
+RADIO_TIERRA_KM = 6371.0
+
+
+def normalizar_texto(texto: str) -> str:
+    """Quita acentos, colapsa espacios y pasa a minúsculas ("Bogotá " -> "bogota")."""
+
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.split()).casefold()
+
+
+def geohash(latitud: float, longitud: float, precision: int = 7) -> str:
+    """Codifica unas coordenadas como geohash (precisión 7 ≈ celdas de 150 m)."""
+
+    rango_lat = [-90.0, 90.0]
+    rango_lon = [-180.0, 180.0]
+    resultado: List[str] = []
+    bits = 0
+    valor = 0
+    par = True
+    while len(resultado) < precision:
+        rango, coordenada = (rango_lon, longitud) if par else (rango_lat, latitud)
+        medio = (rango[0] + rango[1]) / 2
+        valor <<= 1
+        if coordenada >= medio:
+            valor |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        par = not par
+        bits += 1
+        if bits == 5:
+            resultado.append(_BASE32_GEOHASH[valor])
+            bits = 0
+            valor = 0
+    return "".join(resultado)
+
+
+def _distancia_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    fi1, fi2 = math.radians(lat1), math.radians(lat2)
+    dfi = fi2 - fi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dfi / 2) ** 2 + math.cos(fi1) * math.cos(fi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+class _UnionFind:
+    """Conjuntos disjuntos cuya raíz es siempre el id más pequeño del grupo."""
+
+    def __init__(self) -> None:
+        self._padre: Dict[int, int] = {}
+
+    def agregar(self, elemento: int) -> None:
+        self._padre.setdefault(elemento, elemento)
+
+    def raiz(self, elemento: int) -> int:
+        raiz = elemento
+        while self._padre[raiz] != raiz:
+            raiz = self._padre[raiz]
+        while self._padre[elemento] != raiz:
+            self._padre[elemento], elemento = raiz, self._padre[elemento]
+        return raiz
+
+    def unir(self, a: int, b: int) -> None:
+        raiz_a, raiz_b = self.raiz(a), self.raiz(b)
+        if raiz_a != raiz_b:
+            menor, mayor = sorted((raiz_a, raiz_b))
+            self._padre[mayor] = menor
+
+    def duplicados(self) -> Dict[int, int]:
+        return {
+            elemento: raiz
+            for elemento in self._padre
+            if (raiz := self.raiz(elemento)) != elemento
+        }
+
+
+def _tamano_celda(precision: int) -> Tuple[float, float]:
+    """Alto y ancho en grados de una celda de geohash de la precisión dada."""
+
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def _precision_para(umbral_km: float) -> int:
+    """Mayor precisión cuyas celdas miden al menos ``umbral_km`` hasta 60° de latitud."""
+
+    for precision in range(12, 0, -1):
+        alto, ancho = _tamano_celda(precision)
+        km_por_grado = 2 * math.pi * RADIO_TIERRA_KM / 360
+        if min(alto, ancho * math.cos(math.radians(60))) * km_por_grado >= umbral_km:
+            return precision
+    return 1
+
+
+def _celdas_vecinas(
+    latitud: float, longitud: float, precision: int
+) -> Tuple[Tuple[int, int], List[Tuple[int, int]]]:
+    """Celda de geohash del punto y sus 8 vecinas, como índices (fila, columna).
+
+    Los índices identifican las mismas celdas que el geohash de esa precisión
+    (el geohash solo intercala sus bits), pero son mucho más baratos de calcular.
+    """
+
+    alto, ancho = _tamano_celda(precision)
+    filas = round(180.0 / alto)
+    columnas = round(360.0 / ancho)
+    fila = min(int((latitud + 90.0) / alto), filas - 1)
+    columna = min(int((longitud + 180.0) / ancho), columnas - 1)
+    vecinas = [
+        (fila + d_fila, (columna + d_columna) % columnas)
+        for d_fila in (-1, 0, 1)
+        if 0 <= fila + d_fila < filas
+        for d_columna in (-1, 0, 1)
+    ]
+    return (fila, columna), vecinas
+
+
+def _enlazar(
+    grupos: _UnionFind,
+    indice: Dict[Tuple[Any, Tuple[int, int]], List[Tuple[int, float, float]]],
+    bloque: Any,
+    registro: Tuple[int, float, float],
+    precision: int,
+    umbral_km: float,
+) -> None:
+    # Solo se compara con los representantes de la celda y sus vecinas; el
+    # registro pasa a ser representante si no coincide con ninguno. Como los
+    # representantes de un bloque distan más de ``umbral_km`` entre sí, cada
+    # celda guarda pocos y el coste por registro es acotado.
+    ciudad_id, latitud, longitud = registro
+    propia, vecinas = _celdas_vecinas(latitud, longitud, precision)
+    enlazado = False
+    for celda in vecinas:
+        for otro_id, otra_latitud, otra_longitud in indice.get((bloque, celda), ()):
+            if _distancia_km(latitud, longitud, otra_latitud, otra_longitud) <= umbral_km:
+                grupos.unir(otro_id, ciudad_id)
+                enlazado = True
+    if not enlazado:
+        indice.setdefault((bloque, propia), []).append(registro)
+
+
+def agrupar_ciudades(
+    registros: Iterable[Tuple[int, str, str, float, float]],
+    umbral_km: float = 25.0,
+    precision_geohash: int = 7,
+    umbral_cercania_km: float = 0.075,
+) -> Dict[int, int]:
+    """Devuelve ``{id_duplicado: id_canonico}`` para ciudades que son la misma.
+
+    Dos ciudades del mismo país se consideran iguales si están a menos de
+    ``umbral_cercania_km`` (sin importar el nombre) o si su nombre normalizado
+    coincide y están a menos de ``umbral_km``. Para no comparar todos los pares,
+    cada regla indexa representantes por celda de geohash (``precision_geohash``
+    para la cercanía; para el nombre, una precisión derivada de ``umbral_km``) y
+    cada registro solo se compara con su celda y las 8 vecinas, de modo que los
+    puntos a ambos lados de un borde también se encuentran. La cobertura es
+    completa hasta 60° de latitud, donde las celdas se estrechan a la mitad.
+    """
+
+    precision_nombre = _precision_para(umbral_km)
+    grupos = _UnionFind()
+    por_cercania: Dict[Tuple[Any, Tuple[int, int]], List[Tuple[int, float, float]]] = {}
+    por_nombre: Dict[Tuple[Any, Tuple[int, int]], List[Tuple[int, float, float]]] = {}
+    for ciudad_id, nombre, pais, latitud, longitud in registros:
+        grupos.agregar(ciudad_id)
+        pais_normalizado = normalizar_texto(pais)
+        registro = (ciudad_id, latitud, longitud)
+        _enlazar(
+            grupos, por_cercania, pais_normalizado, registro,
+            precision_geohash, umbral_cercania_km,
+        )
+        _enlazar(
+            grupos, por_nombre, (normalizar_texto(nombre), pais_normalizado), registro,
+            precision_nombre, umbral_km,
+        )
+    return grupos.duplicados()
+
+
+def agrupar_eventos(
+    registros: Iterable[Tuple[int, str, str, int]],
+    ciudad_canonica: Dict[int, int] | None = None,
+) -> Dict[int, int]:
+    """Devuelve ``{id_duplicado: id_canonico}`` para eventos repetidos.
+
+    Los eventos se bloquean por título normalizado, ciudad canónica y día de la
+    fecha; todos los de un mismo bloque se fusionan en el de menor id.
+    """
+
+    ciudad_canonica = ciudad_canonica or {}
+    grupos = _UnionFind()
+    primero_por_clave: Dict[Tuple[str, int, str], int] = {}
+    for evento_id, titulo, fecha, ciudad_id in registros:
+        grupos.agregar(evento_id)
+        clave = (
+            normalizar_texto(titulo),
+            ciudad_canonica.get(ciudad_id, ciudad_id),
+            datetime.fromisoformat(fecha).date().isoformat(),
+        )
+        if clave in primero_por_clave:
+            grupos.unir(primero_por_clave[clave], evento_id)
+        else:
+            primero_por_clave[clave] = evento_id
+    return grupos.duplicados()
+
+
+def _agrupar_por_canonico(mapa: Dict[int, int]) -> Dict[int, List[int]]:
+    grupos: Dict[int, List[int]] = {}
+    for duplicado, canonico in sorted(mapa.items()):
+        grupos.setdefault(canonico, []).append(duplicado)
+    return grupos
+
+
+@dataclass
+class InformeFusion:
+    """Resumen de una ejecución de :func:`deduplicar_db`."""
+
+    ciudades_analizadas: int = 0
+    eventos_analizados: int = 0
+    ciudades_fusionadas: Dict[int, List[int]] = field(default_factory=dict)
+    eventos_fusionados: Dict[int, List[int]] = field(default_factory=dict)
+
+    @property
+    def ciudades_eliminadas(self) -> int:
+        return sum(map(len, self.ciudades_fusionadas.values()))
+
+    @property
+    def eventos_eliminados(self) -> int:
+        return sum(map(len, self.eventos_fusionados.values()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ciudades_analizadas": self.ciudades_analizadas,
+            "ciudades_eliminadas": self.ciudades_eliminadas,
+            "eventos_analizados": self.eventos_analizados,
+            "eventos_eliminados": self.eventos_eliminados,
+            "ciudades_fusionadas": self.ciudades_fusionadas,
+            "eventos_fusionados": self.eventos_fusionados,
+        }
+
+
+def _cargar_mapa(conn: sqlite3.Connection, tabla: str, mapa: Dict[int, int]) -> None:
+    conn.execute(f"DROP TABLE IF EXISTS temp.{tabla}")
+    conn.execute(f"CREATE TEMP TABLE {tabla} (viejo INTEGER PRIMARY KEY, nuevo INTEGER NOT NULL)")
+    conn.execute(f"CREATE INDEX temp.{tabla}_nuevo ON {tabla}(nuevo)")
+    conn.executemany(f"INSERT INTO {tabla}(viejo, nuevo) VALUES (?, ?)", mapa.items())
+
+
+def deduplicar_db(
+    ruta: Path | str = RUTA_DB,
+    umbral_km: float = 25.0,
+    precision_geohash: int = 7,
+) -> InformeFusion:
+    """Fusiona ciudades y eventos duplicados en una sola transacción.
+
+    Los eventos de ciudades duplicadas pasan a la ciudad canónica (menor id).
+    Los eventos duplicados se funden en el de menor id, que conserva el máximo
+    de capacidad y de asistentes del grupo para no sumar registros repetidos.
+    """
+
+    ruta = Path(ruta)
+    informe = InformeFusion()
+    conn = sqlite3.connect(ruta)
+    try:
+        with conn:
+            filas_ciudades = conn.execute(
+                "SELECT id, nombre, pais, latitud, longitud FROM ciudades ORDER BY id"
+            ).fetchall()
+            informe.ciudades_analizadas = len(filas_ciudades)
+            mapa_ciudades = agrupar_ciudades(filas_ciudades, umbral_km, precision_geohash)
+
+            filas_eventos = conn.execute(
+                "SELECT id, titulo, fecha, ciudad_id FROM eventos ORDER BY id"
+            ).fetchall()
+            informe.eventos_analizados = len(filas_eventos)
+            mapa_eventos = agrupar_eventos(filas_eventos, mapa_ciudades)
+
+            _cargar_mapa(conn, "mapa_ciudades", mapa_ciudades)
+            conn.execute(
+                """
+                UPDATE eventos
+                SET ciudad_id = (
+                    SELECT nuevo FROM mapa_ciudades WHERE viejo = eventos.ciudad_id
+                )
+                WHERE ciudad_id IN (SELECT viejo FROM mapa_ciudades);
+                """
+            )
+            conn.execute("DELETE FROM ciudades WHERE id IN (SELECT viejo FROM mapa_ciudades)")
+
+            _cargar_mapa(conn, "mapa_eventos", mapa_eventos)
+            conn.execute(
+                """
+                UPDATE eventos
+                SET capacidad_maxima = MAX(capacidad_maxima, (
+                        SELECT MAX(d.capacidad_maxima) FROM eventos d
+                        JOIN mapa_eventos m ON m.viejo = d.id
+                        WHERE m.nuevo = eventos.id)),
+                    asistentes_registrados = MAX(asistentes_registrados, (
+                        SELECT MAX(d.asistentes_registrados) FROM eventos d
+                        JOIN mapa_eventos m ON m.viejo = d.id
+                        WHERE m.nuevo = eventos.id))
+                WHERE id IN (SELECT nuevo FROM mapa_eventos);
+                """
+            )
+            conn.execute("DELETE FROM eventos WHERE id IN (SELECT viejo FROM mapa_eventos)")
+    finally:
+        conn.close()
+
+    informe.ciudades_fusionadas = _agrupar_por_canonico(mapa_ciudades)
+    informe.eventos_fusionados = _agrupar_por_canonico(mapa_eventos)
+    return informe
+
+
+__all__ = [
+    "InformeFusion",
+    "agrupar_ciudades",
+    "agrupar_eventos",
+    "deduplicar_db",
+    "geohash",
+    "normalizar_texto",
+]
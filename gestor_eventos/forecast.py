@@ -0,0 +1,248 @@
+"""Precarga de pronósticos del clima para las fechas de los próximos eventos."""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import urllib.parse
+import urllib.request
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .models import Ciudad, Evento
+from .weather import API_URL
+
+logger = logging.getLogger(__name__)
+
+HORIZONTE_DIAS = 16
+"""Días hacia adelante para los que Open-Meteo ofrece pronóstico diario."""
+
+Transporte = Callable[[str, float], Dict]
+
+
+def _transporte_http(url: str, timeout: float) -> Dict:
+    with urllib.request.urlopen(url, timeout=timeout) as response:  # nosec B310
+        return json.loads(response.read().decode("utf-8"))
+
+
+def _construir_url_pronostico(ciudad: Ciudad, fecha: date) -> str:
+    query = urllib.parse.urlencode(
+        {
+            "latitude": ciudad.latitud,
+            "longitude": ciudad.longitud,
+            "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max",
+            "timezone": "auto",
+            "start_date": fecha.isoformat(),
+            "end_date": fecha.isoformat(),
+        }
+    )
+    return f"{API_URL}?{query}"
+
+
+def necesidades_pronostico(
+    eventos: Iterable[Evento],
+    ahora: Optional[datetime] = None,
+    horizonte_dias: int = HORIZONTE_DIAS,
+) -> List[Tuple[Ciudad, date]]:
+    """Devuelve los pares (ciudad, fecha) distintos a precargar, primero los más próximos.
+
+    Solo se incluyen fechas desde hoy y durante ``horizonte_dias`` días (hoy
+    cuenta como el primero), que es lo que la API acepta.
+    """
+
+    hoy = (ahora or datetime.now()).date()
+    limite = hoy + timedelta(days=horizonte_dias)
+    necesidades: Dict[Tuple[str, str, date], Tuple[Ciudad, date]] = {}
+    for evento in filter(lambda e: hoy <= e.fecha.date() < limite, eventos):
+        fecha = evento.fecha.date()
+        necesidades.setdefault(
+            (evento.ciudad.nombre, evento.ciudad.pais, fecha), (evento.ciudad, fecha)
+        )
+    return sorted(
+        necesidades.values(),
+        key=lambda par: (par[1], par[0].nombre, par[0].pais),
+    )
+
+
+class CachePronosticos:
+    """Almacén en memoria, seguro entre hilos, de pronósticos por ciudad y fecha.
+
+    Junto a cada pronóstico se guarda, aparte, el instante en que se obtuvo
+    para decidir su vigencia sin exponerlo a quien lo consulta.
+    """
+
+    def __init__(self) -> None:
+        self._datos: Dict[Tuple[str, str, str], Tuple[Dict, float]] = {}
+        self._bloqueo = threading.Lock()
+
+    @staticmethod
+    def _clave(ciudad: Ciudad, fecha: date) -> Tuple[str, str, str]:
+        return (ciudad.nombre, ciudad.pais, fecha.isoformat())
+
+    def guardar(
+        self, ciudad: Ciudad, fecha: date, pronostico: Dict, obtenido: float = 0.0
+    ) -> None:
+        with self._bloqueo:
+            self._datos[self._clave(ciudad, fecha)] = (pronostico, obtenido)
+
+    def obtener(self, ciudad: Ciudad, fecha: date | datetime) -> Optional[Dict]:
+        """Lectura local del pronóstico; devuelve ``None`` si aún no se ha precargado."""
+
+        if isinstance(fecha, datetime):
+            fecha = fecha.date()
+        with self._bloqueo:
+            entrada = self._datos.get(self._clave(ciudad, fecha))
+        return entrada[0] if entrada is not None else None
+
+    def obtenido_en(self, ciudad: Ciudad, fecha: date) -> Optional[float]:
+        """Instante (según el reloj del planificador) en que se guardó el pronóstico."""
+
+        with self._bloqueo:
+            entrada = self._datos.get(self._clave(ciudad, fecha))
+        return entrada[1] if entrada is not None else None
+
+    def podar(self, antes_de: date) -> int:
+        """Elimina los pronósticos de fechas anteriores a ``antes_de``."""
+
+        limite = antes_de.isoformat()
+        with self._bloqueo:
+            vencidas = [clave for clave in self._datos if clave[2] < limite]
+            for clave in vencidas:
+                del self._datos[clave]
+        return len(vencidas)
+
+    def __len__(self) -> int:
+        with self._bloqueo:
+            return len(self._datos)
+
+
+class PlanificadorPronosticos:
+    """Precarga pronósticos fuera del camino de las peticiones.
+
+    En cada ciclo calcula las necesidades (ciudad, fecha) de los eventos
+    próximos, descarta las que siguen vigentes en la caché y consulta el resto
+    por orden de cercanía, respetando ``max_por_segundo`` peticiones.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[CachePronosticos] = None,
+        transporte: Transporte = _transporte_http,
+        max_por_segundo: float = 5.0,
+        vigencia: float = 3 * 3600,
+        timeout: float = 10.0,
+        reloj: Callable[[], float] = time.monotonic,
+        dormir: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if max_por_segundo <= 0:
+            raise ValueError("La tasa máxima de peticiones debe ser positiva.")
+        self.cache = cache if cache is not None else CachePronosticos()
+        self.transporte = transporte
+        self.intervalo_minimo = 1.0 / max_por_segundo
+        self.vigencia = vigencia
+        self.timeout = timeout
+        self._reloj = reloj
+        self._dormir = dormir
+        self._ultima_peticion: Optional[float] = None
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def _esta_vigente(self, ciudad: Ciudad, fecha: date) -> bool:
+        obtenido = self.cache.obtenido_en(ciudad, fecha)
+        return obtenido is not None and self._reloj() - obtenido < self.vigencia
+
+    def _esperar_turno(self) -> None:
+        if self._ultima_peticion is not None:
+            restante = self.intervalo_minimo - (self._reloj() - self._ultima_peticion)
+            if restante > 0:
+                self._dormir(restante)
+        self._ultima_peticion = self._reloj()
+
+    def _consultar(self, ciudad: Ciudad, fecha: date) -> Optional[Dict]:
+        url = _construir_url_pronostico(ciudad, fecha)
+        try:
+            diario = self.transporte(url, self.timeout).get("daily", {})
+            primeros = {
+                campo: (diario.get(campo) or [None])[0]
+                for campo in (
+                    "temperature_2m_max",
+                    "temperature_2m_min",
+                    "precipitation_sum",
+                    "windspeed_10m_max",
+                )
+            }
+        except Exception:  # noqa: BLE001 - un fallo no debe detener la precarga
+            logger.warning(
+                "No fue posible obtener el pronóstico de %s para %s.",
+                ciudad.nombre, fecha, exc_info=True,
+            )
+            return None
+
+        return {
+            "ciudad": ciudad.nombre,
+            "pais": ciudad.pais,
+            "fecha": fecha.isoformat(),
+            "temperatura_max": primeros["temperature_2m_max"],
+            "temperatura_min": primeros["temperature_2m_min"],
+            "precipitacion": primeros["precipitation_sum"],
+            "viento_max": primeros["windspeed_10m_max"],
+        }
+
+    def ejecutar_ciclo(
+        self, eventos: Iterable[Evento], ahora: Optional[datetime] = None
+    ) -> int:
+        """Precarga los pronósticos pendientes y devuelve cuántos se actualizaron.
+
+        Antes de consultar, descarta de la caché los pronósticos de días pasados.
+        """
+
+        self.cache.podar((ahora or datetime.now()).date())
+        actualizados = 0
+        for ciudad, fecha in necesidades_pronostico(eventos, ahora):
+            if self._parar.is_set():
+                break
+            if self._esta_vigente(ciudad, fecha):
+                continue
+            self._esperar_turno()
+            pronostico = self._consultar(ciudad, fecha)
+            if pronostico is not None:
+                self.cache.guardar(ciudad, fecha, pronostico, self._reloj())
+                actualizados += 1
+        return actualizados
+
+    def iniciar(
+        self, proveedor_eventos: Callable[[], Iterable[Evento]], periodo: float = 600.0
+    ) -> None:
+        """Lanza un hilo que ejecuta un ciclo de precarga cada ``periodo`` segundos."""
+
+        if self._hilo is not None and self._hilo.is_alive():
+            raise RuntimeError("El planificador ya está en ejecución.")
+        self._parar.clear()
+
+        def bucle() -> None:
+            while not self._parar.is_set():
+                try:
+                    self.ejecutar_ciclo(proveedor_eventos())
+                except Exception:  # noqa: BLE001 - se reintenta en el siguiente ciclo
+                    logger.exception("Falló el ciclo de precarga de pronósticos.")
+                self._parar.wait(periodo)
+
+        self._hilo = threading.Thread(target=bucle, name="PlanificadorPronosticos", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float | None = None) -> None:
+        """Detiene el hilo de precarga si está activo."""
+
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+
+__all__ = [
+    "CachePronosticos",
+    "PlanificadorPronosticos",
+    "necesidades_pronostico",
+]
@@ -0,0 +1,261 @@
+"""Servicio HTTP de solo lectura sobre la base de eventos, con caché de respuestas."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import urllib.parse
+from collections import OrderedDict
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .forecast import CachePronosticos, PlanificadorPronosticos
+from .models import Evento
+from .processing import (
+    eventos_entre_fechas,
+    filtrar_eventos_por_ciudad,
+    ordenar_eventos_por_fecha,
+    resumen_asistentes,
+)
+from .storage import RUTA_DB, listar_eventos_db
+
+logger = logging.getLogger(__name__)
+
+FILTROS = ("ciudad", "categoria", "desde", "hasta")
+
+
+class CatalogoEventos:
+    """Copia en memoria de los eventos que se recarga solo cuando cambia la base.
+
+    Los cambios se detectan con ``PRAGMA data_version`` sobre una conexión
+    propia, que se incrementa cada vez que otra conexión confirma una escritura,
+    y con la identidad y fecha de modificación del archivo: si el archivo se
+    reemplaza (como hace ``run_demo`` al borrarlo y recrearlo) se reabre la
+    conexión, porque la anterior seguiría apuntando al archivo borrado.
+    """
+
+    def __init__(self, ruta: Path | str = RUTA_DB) -> None:
+        self.ruta = Path(ruta)
+        self._bloqueo = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._archivo: Optional[Tuple[int, int, int]] = None
+        self._data_version: Optional[int] = None
+        self._eventos: List[Evento] = []
+        self.version = 0
+
+    def eventos(self) -> Tuple[int, List[Evento]]:
+        """Devuelve ``(version, eventos)``, recargando si la base cambió."""
+
+        with self._bloqueo:
+            estado = os.stat(self.ruta)
+            archivo = (estado.st_dev, estado.st_ino, estado.st_mtime_ns)
+            if self._conn is None or archivo[:2] != (self._archivo or ())[:2]:
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = sqlite3.connect(self.ruta, check_same_thread=False)
+                self._data_version = None
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version or archivo != self._archivo:
+                self._eventos = listar_eventos_db(self.ruta)
+                self._data_version = data_version
+                self._archivo = archivo
+                self.version += 1
+            return self.version, self._eventos
+
+    def cerrar(self) -> None:
+        with self._bloqueo:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _filtrar(eventos: List[Evento], parametros: Dict[str, str]) -> List[Evento]:
+    if "ciudad" in parametros:
+        eventos = filtrar_eventos_por_ciudad(eventos, parametros["ciudad"])
+    if "categoria" in parametros:
+        categoria = parametros["categoria"].strip().lower()
+        eventos = list(filter(lambda e: e.categoria.lower() == categoria, eventos))
+    if "desde" in parametros or "hasta" in parametros:
+        desde = datetime.fromisoformat(parametros.get("desde", datetime.min.isoformat()))
+        hasta = datetime.fromisoformat(parametros.get("hasta", datetime.max.isoformat()))
+        eventos = eventos_entre_fechas(eventos, desde, hasta)
+    return ordenar_eventos_por_fecha(eventos)
+
+
+class ServicioConsultas:
+    """Lógica de las rutas ``/eventos``, ``/resumen`` y ``/clima``.
+
+    Solo se atienden los parámetros de ``FILTROS``; el resto se ignora. Las
+    respuestas de ``/eventos`` y ``/resumen`` se guardan por ruta y filtros en
+    una caché LRU de hasta ``max_respuestas`` entradas, que se vacía cuando
+    cambia la versión del catálogo. ``/clima``
+    lee los pronósticos precargados en ``cache_pronosticos`` y no se cachea,
+    porque se actualiza con independencia de la base.
+    """
+
+    def __init__(
+        self,
+        catalogo: CatalogoEventos,
+        cache_pronosticos: Optional[CachePronosticos] = None,
+        max_respuestas: int = 1024,
+    ) -> None:
+        self.catalogo = catalogo
+        self.cache_pronosticos = cache_pronosticos
+        self.max_respuestas = max_respuestas
+        self._bloqueo = threading.Lock()
+        self._respuestas: OrderedDict[Tuple[str, Tuple], Tuple[bytes, str]] = OrderedDict()
+        self._version_respuestas = 0
+
+    def responder(
+        self, ruta: str, parametros: Dict[str, str]
+    ) -> Tuple[HTTPStatus, bytes, Optional[str]]:
+        """Devuelve ``(estado, cuerpo, etag)``; el ETag solo acompaña respuestas 200."""
+
+        parametros = {k: v for k, v in parametros.items() if k in FILTROS}
+        version, eventos = self.catalogo.eventos()
+        clave = (ruta, tuple(sorted(parametros.items())))
+        if ruta in ("/eventos", "/resumen"):
+            with self._bloqueo:
+                if version != self._version_respuestas:
+                    self._respuestas.clear()
+                    self._version_respuestas = version
+                cacheada = self._respuestas.get(clave)
+                if cacheada is not None:
+                    self._respuestas.move_to_end(clave)
+            if cacheada is not None:
+                return (HTTPStatus.OK, *cacheada)
+
+        try:
+            seleccion = _filtrar(eventos, parametros)
+        except (ValueError, TypeError) as exc:
+            return HTTPStatus.BAD_REQUEST, _a_json({"error": str(exc)}), None
+
+        if ruta == "/eventos":
+            datos = [evento.to_dict() for evento in seleccion]
+        elif ruta == "/resumen":
+            datos = resumen_asistentes(seleccion)
+            datos["ciudades"] = sorted(datos["ciudades"])
+        elif ruta == "/clima":
+            cuerpo = _a_json(self._clima(seleccion))
+            return HTTPStatus.OK, cuerpo, _etag(cuerpo)
+        else:
+            error = _a_json({"error": f"Ruta no encontrada: {ruta}"})
+            return HTTPStatus.NOT_FOUND, error, None
+
+        cuerpo = _a_json(datos)
+        etag = _etag(cuerpo)
+        with self._bloqueo:
+            if version == self._version_respuestas:
+                self._respuestas[clave] = (cuerpo, etag)
+                while len(self._respuestas) > self.max_respuestas:
+                    self._respuestas.popitem(last=False)
+        return HTTPStatus.OK, cuerpo, etag
+
+    def _clima(self, eventos: List[Evento]) -> List[Dict]:
+        resultados = []
+        for evento in eventos:
+            pronostico = None
+            if self.cache_pronosticos is not None:
+                pronostico = self.cache_pronosticos.obtener(evento.ciudad, evento.fecha)
+            resultados.append({
+                "titulo": evento.titulo,
+                "fecha": evento.fecha.isoformat(),
+                "ciudad": evento.ciudad.nombre,
+                "pais": evento.ciudad.pais,
+                "pronostico": pronostico,
+            })
+        return resultados
+
+
+def _a_json(datos) -> bytes:
+    return json.dumps(datos, ensure_ascii=False).encode("utf-8")
+
+
+def _etag(cuerpo: bytes) -> str:
+    return f'"{hashlib.sha1(cuerpo).hexdigest()}"'  # nosec B324 - no criptográfico
+
+
+class _ManejadorConsultas(BaseHTTPRequestHandler):
+    servicio: ServicioConsultas
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802 - nombre impuesto por BaseHTTPRequestHandler
+        url = urllib.parse.urlsplit(self.path)
+        parametros = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            estado, cuerpo, etag = self.servicio.responder(url.path.rstrip("/") or "/", parametros)
+        except Exception:  # noqa: BLE001 - se responde 500 en lugar de cortar la conexión
+            logger.exception("Error al atender %s", self.path)
+            estado, etag = HTTPStatus.INTERNAL_SERVER_ERROR, None
+            cuerpo = _a_json({"error": "Error interno del servidor."})
+
+        if etag is not None and etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        pass
+
+
+def crear_servidor(
+    host: str = "127.0.0.1",
+    puerto: int = 8000,
+    ruta: Path | str = RUTA_DB,
+    cache_pronosticos: Optional[CachePronosticos] = None,
+) -> ThreadingHTTPServer:
+    """Crea (sin arrancar) el servidor HTTP; ``puerto=0`` elige uno libre."""
+
+    servicio = ServicioConsultas(CatalogoEventos(ruta), cache_pronosticos)
+    manejador = type("ManejadorConsultas", (_ManejadorConsultas,), {"servicio": servicio})
+    servidor = ThreadingHTTPServer((host, puerto), manejador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servicio HTTP de consulta de eventos.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--db", default=str(RUTA_DB))
+    args = parser.parse_args()
+
+    cache = CachePronosticos()
+    planificador = PlanificadorPronosticos(cache)
+    planificador.iniciar(lambda: listar_eventos_db(args.db))
+    servidor = crear_servidor(args.host, args.puerto, args.db, cache)
+    print(f"Sirviendo eventos en http://{args.host}:{servidor.server_address[1]}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        planificador.detener(timeout=5)
+
+
+__all__ = ["CatalogoEventos", "ServicioConsultas", "crear_servidor"]
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ from __future__ import annotations
 import json
 import sqlite3
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Iterable, List, Sequence, Tuple
 
 from .models import Ciudad, Conferencia, Evento
 
@@ -89,7 +89,6 @@ def _obtener_id_ciudad(conn: sqlite3.Connection, ciudad: Ciudad) -> int:
         """,
         (ciudad.nombre, ciudad.pais, ciudad.latitud, ciudad.longitud, ciudad.descripcion),
     )
-    conn.commit()
     cursor = conn.execute(
         "SELECT id FROM ciudades WHERE nombre = ? AND pais = ?",
         (ciudad.nombre, ciudad.pais),
@@ -108,38 +107,43 @@ def guardar_ciudad_en_db(ciudad: Ciudad, ruta: Path | str = RUTA_DB) -> int:
         return _obtener_id_ciudad(conn, ciudad)
 
 
+def _insertar_evento(conn: sqlite3.Connection, evento: Evento, ciudad_id: int) -> int:
+    datos_extra = {}
+    if isinstance(evento, Conferencia):
+        datos_extra = {
+            "tematica": evento.tematica,
+            "ponentes": evento.ponentes,
+            "modalidad": evento.modalidad,
+        }
+    cursor = conn.execute(
+        """
+        INSERT INTO eventos(
+            titulo, fecha, categoria, capacidad_maxima,
+            asistentes_registrados, ciudad_id, datos_extra
+        ) VALUES (?, ?, ?, ?, ?, ?, ?);
+        """,
+        (
+            evento.titulo,
+            evento.fecha.isoformat(),
+            evento.categoria,
+            evento.capacidad_maxima,
+            evento.asistentes_registrados,
+            ciudad_id,
+            json.dumps(datos_extra, ensure_ascii=False),
+        ),
+    )
+    return int(cursor.lastrowid)
+
+
 def guardar_evento_en_db(evento: Evento, ruta: Path | str = RUTA_DB) -> int:
     """Inserta un evento y devuelve su id."""
 
     ruta = Path(ruta)
     with sqlite3.connect(ruta) as conn:
         ciudad_id = _obtener_id_ciudad(conn, evento.ciudad)
-        datos_extra = {}
-        if isinstance(evento, Conferencia):
-            datos_extra = {
-                "tematica": evento.tematica,
-                "ponentes": evento.ponentes,
-                "modalidad": evento.modalidad,
-            }
-        cursor = conn.execute(
-            """
-            INSERT INTO eventos(
-                titulo, fecha, categoria, capacidad_maxima,
-                asistentes_registrados, ciudad_id, datos_extra
-            ) VALUES (?, ?, ?, ?, ?, ?, ?);
-            """,
-            (
-                evento.titulo,
-                evento.fecha.isoformat(),
-                evento.categoria,
-                evento.capacidad_maxima,
-                evento.asistentes_registrados,
-                ciudad_id,
-                json.dumps(datos_extra, ensure_ascii=False),
-            ),
-        )
+        evento_id = _insertar_evento(conn, evento, ciudad_id)
         conn.commit()
-        return int(cursor.lastrowid)
+        return evento_id
 
 
 def _crear_ciudad_desde_row(row: Sequence) -> Ciudad:
@@ -166,6 +170,12 @@ def listar_ciudades_db(ruta: Path | str = RUTA_DB) -> List[Ciudad]:
 def listar_eventos_db(ruta: Path | str = RUTA_DB) -> List[Evento]:
     """Recupera todos los eventos junto a sus ciudades."""
 
+    return [evento for _, evento in listar_eventos_con_id_db(ruta)]
+
+
+def listar_eventos_con_id_db(ruta: Path | str = RUTA_DB) -> List[Tuple[int, Evento]]:
+    """Recupera los eventos como pares ``(id, evento)`` ordenados por fecha."""
+
     ruta = Path(ruta)
     with sqlite3.connect(ruta) as conn:
         rows = conn.execute(
@@ -180,7 +190,7 @@ def listar_eventos_db(ruta: Path | str = RUTA_DB) -> List[Evento]:
             """
         ).fetchall()
 
-    eventos: List[Evento] = []
+    eventos: List[Tuple[int, Evento]] = []
     for row in rows:
         ciudad = Ciudad(
             nombre=row[8],
@@ -210,5 +220,5 @@ def listar_eventos_db(ruta: Path | str = RUTA_DB) -> List[Evento]:
                 categoria=row[3],
                 asistentes_registrados=int(row[5]),
             )
-        eventos.append(evento)
+        eventos.append((int(row[0]), evento))
     return eventos
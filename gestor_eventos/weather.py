@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import http.client
 import json
+import threading
+import time
 import urllib.error
 import urllib.parse
 import urllib.request
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from dataclasses import asdict
-from typing import Dict, Iterable
+from typing import Callable, Dict, Iterable, Optional
 
 from .models import Ciudad
 
@@ -26,44 +30,186 @@ def _construir_url(ciudad: Ciudad) -> str:
     return f"{API_URL}?{query}"
 
 
-def _consultar_ciudad(ciudad: Ciudad, timeout: float = 10.0) -> Dict:
-    url = _construir_url(ciudad)
+class InterruptorCircuito:
+    """Circuit breaker: tras ``umbral_fallos`` errores seguidos rechaza llamadas.
+
+    Pasado ``tiempo_recuperacion`` deja pasar una única consulta de prueba; si
+    tiene éxito el circuito se cierra y si falla vuelve a abrirse.
+    """
+
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+    def __init__(
+        self,
+        umbral_fallos: int = 3,
+        tiempo_recuperacion: float = 30.0,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if umbral_fallos <= 0:
+            raise ValueError("El umbral de fallos debe ser positivo.")
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_recuperacion = tiempo_recuperacion
+        self._reloj = reloj
+        self._bloqueo = threading.Lock()
+        self._estado = self.CERRADO
+        self._fallos = 0
+        self._abierto_desde = 0.0
+
+    @property
+    def estado(self) -> str:
+        with self._bloqueo:
+            return self._estado
+
+    def permitir(self) -> bool:
+        with self._bloqueo:
+            if self._estado == self.CERRADO:
+                return True
+            if (
+                self._estado == self.ABIERTO
+                and self._reloj() - self._abierto_desde >= self.tiempo_recuperacion
+            ):
+                self._estado = self.SEMIABIERTO
+                return True
+            return False
+
+    def registrar_exito(self) -> None:
+        with self._bloqueo:
+            self._estado = self.CERRADO
+            self._fallos = 0
+
+    def registrar_fallo(self) -> None:
+        with self._bloqueo:
+            self._fallos += 1
+            if self._estado == self.SEMIABIERTO or self._fallos >= self.umbral_fallos:
+                self._estado = self.ABIERTO
+                self._abierto_desde = self._reloj()
+
+
+class _VueloUnico:
+    """Agrupa llamadas idénticas en curso para que solo una llegue a la red."""
+
+    def __init__(self) -> None:
+        self._bloqueo = threading.Lock()
+        self._en_curso: Dict[str, Future] = {}
+
+    def ejecutar(self, clave: str, funcion: Callable[[], Dict], timeout: float) -> Dict:
+        with self._bloqueo:
+            futuro = self._en_curso.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._en_curso[clave] = futuro
+        if not lider:
+            return futuro.result(timeout=timeout)
+        try:
+            futuro.set_result(funcion())
+        except BaseException as exc:
+            futuro.set_exception(exc)
+        finally:
+            with self._bloqueo:
+                del self._en_curso[clave]
+        return futuro.result()
+
+
+_interruptor = InterruptorCircuito()
+_vuelos = _VueloUnico()
+
+
+def _resultado_error(ciudad: Ciudad, mensaje: str) -> Dict:
+    return {
+        "ciudad": ciudad.nombre,
+        "pais": ciudad.pais,
+        "error": mensaje,
+    }
+
+
+def _es_fallo_del_servicio(exc: Exception) -> bool:
+    """Solo los 5xx, los tiempos agotados y los errores de conexión abren el circuito."""
+
+    if isinstance(exc, urllib.error.HTTPError):
+        return exc.code >= 500
+    return isinstance(exc, (OSError, http.client.HTTPException))
+
+
+def _pedir_clima(ciudad: Ciudad, url: str, timeout: float) -> Dict:
+    if not _interruptor.permitir():
+        return _resultado_error(ciudad, "Servicio de clima no disponible (circuito abierto).")
     try:
         with urllib.request.urlopen(url, timeout=timeout) as response:  # nosec B310
             data = json.loads(response.read().decode("utf-8"))
-            actual = data.get("current_weather", {})
-            return {
-                "ciudad": ciudad.nombre,
-                "pais": ciudad.pais,
-                "temperatura": actual.get("temperature"),
-                "viento": actual.get("windspeed"),
-                "hora": actual.get("time"),
-            }
-    except (urllib.error.HTTPError, urllib.error.URLError, TimeoutError) as exc:
-        return {
+        actual = data.get("current_weather", {})
+        resultado = {
             "ciudad": ciudad.nombre,
             "pais": ciudad.pais,
-            "error": str(exc),
+            "temperatura": actual.get("temperature"),
+            "viento": actual.get("windspeed"),
+            "hora": actual.get("time"),
         }
+    except Exception as exc:  # noqa: BLE001 - una ciudad no debe hacer fallar el lote
+        # Siempre se registra un resultado para que la consulta de prueba del
+        # estado semiabierto nunca deje el circuito bloqueado.
+        if _es_fallo_del_servicio(exc):
+            _interruptor.registrar_fallo()
+        else:
+            _interruptor.registrar_exito()
+        return _resultado_error(ciudad, str(exc) or exc.__class__.__name__)
+    _interruptor.registrar_exito()
+    return resultado
+
+
+def _consultar_ciudad(
+    ciudad: Ciudad, timeout: float = 10.0, limite: Optional[float] = None
+) -> Dict:
+    if limite is not None:
+        timeout = min(timeout, limite - time.monotonic())
+    if timeout <= 0:
+        return _resultado_error(ciudad, "Tiempo agotado antes de consultar el clima.")
+    url = _construir_url(ciudad)
+    try:
+        resultado = _vuelos.ejecutar(url, lambda: _pedir_clima(ciudad, url, timeout), timeout)
+    except FuturesTimeoutError:
+        return _resultado_error(ciudad, "Tiempo agotado esperando una consulta en curso.")
+    # Un resultado compartido puede venir de otra ciudad con las mismas coordenadas.
+    return {**resultado, "ciudad": ciudad.nombre, "pais": ciudad.pais}
 
 
 def consultar_clima_ciudades(
     ciudades: Iterable[Ciudad],
     max_workers: int = 5,
+    timeout: float = 10.0,
+    presupuesto: Optional[float] = None,
 ) -> Dict[str, Dict]:
-    """Consulta concurrente del clima para cada ciudad."""
+    """Consulta concurrente del clima para cada ciudad.
+
+    ``presupuesto`` fija un tiempo total para todo el lote: cada consulta recibe
+    el tiempo restante y las que no terminan a tiempo se devuelven con error.
+    """
 
+    limite = time.monotonic() + presupuesto if presupuesto is not None else None
     resultados: Dict[str, Dict] = {}
     ciudades_lista = list(ciudades)
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
         futuro_por_ciudad = {
-            executor.submit(_consultar_ciudad, ciudad): ciudad for ciudad in ciudades_lista
+            executor.submit(_consultar_ciudad, ciudad, timeout, limite): ciudad
+            for ciudad in ciudades_lista
         }
-        for futuro in as_completed(futuro_por_ciudad):
-            ciudad = futuro_por_ciudad[futuro]
-            resultado = futuro.result()
-            resultados[f"{ciudad.nombre}|{ciudad.pais}"] = resultado
+        restante = max(0.0, limite - time.monotonic()) if limite is not None else None
+        try:
+            for futuro in as_completed(futuro_por_ciudad, timeout=restante):
+                ciudad = futuro_por_ciudad[futuro]
+                resultados[f"{ciudad.nombre}|{ciudad.pais}"] = futuro.result()
+        except FuturesTimeoutError:
+            for ciudad in ciudades_lista:
+                resultados.setdefault(
+                    f"{ciudad.nombre}|{ciudad.pais}",
+                    _resultado_error(ciudad, "Tiempo agotado para el lote de consultas."),
+                )
+    finally:
+        executor.shutdown(wait=limite is None, cancel_futures=True)
     return resultados
 
 
-__all__ = ["consultar_clima_ciudades", "_construir_url"]
+__all__ = ["consultar_clima_ciudades", "InterruptorCircuito", "_construir_url"]
@@ -0,0 +1,410 @@
+"""Persistencia diferida (write-behind) de eventos en SQLite mediante un hilo de fondo."""
+
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .models import Ciudad, Evento
+from .storage import RUTA_DB, _insertar_evento, _obtener_id_ciudad
+
+_ESPERA_SONDEO = 0.05
+
+ReferenciaEvento = Union[int, "Future[int]"]
+
+
+@dataclass
+class _Mutacion:
+    tipo: str
+    datos: Any
+
+
+@dataclass
+class _Senal:
+    cerrar: bool = False
+    listo: threading.Event = field(default_factory=threading.Event)
+    error: Optional[BaseException] = None
+
+
+@dataclass
+class MutacionDescartada:
+    """Mutación que no llegó a la base, junto con el motivo."""
+
+    tipo: str
+    datos: Any
+    motivo: str
+
+
+class EventStoreWriteBehind:
+    """Acumula mutaciones en una cola y las vuelca a SQLite por lotes.
+
+    Un único hilo de fondo consume la cola en orden FIFO, agrupa las mutaciones
+    por evento y ciudad, y las escribe en una sola transacción cuando se alcanza
+    ``tamano_lote`` o pasan ``intervalo`` segundos desde la primera pendiente.
+    Si la transacción falla, el lote se conserva y se reintenta sin alterar el
+    orden; tras ``max_reintentos`` fallos seguidos se descarta y queda en
+    :meth:`descartadas`. Cuando la cola está llena, los productores esperan.
+
+    ``guardar_evento`` devuelve un ``Future`` que se resuelve con el id de la
+    fila una vez confirmada la transacción; ese mismo ``Future`` (o un id ya
+    conocido, p. ej. de ``listar_eventos_con_id_db``) sirve como referencia en
+    ``registrar_asistentes``, incluso antes de que el evento llegue a la base.
+
+    Los cambios de asistentes se aplican en el orden en que se encolaron y con
+    la misma regla que ``Evento.registrar_asistentes``: un cambio que dejaría
+    el total por debajo de cero o por encima de la capacidad, o que apunta a un
+    evento inexistente, se rechaza completo y se registra en :meth:`descartadas`.
+    """
+
+    def __init__(
+        self,
+        ruta: Path | str = RUTA_DB,
+        tamano_lote: int = 500,
+        intervalo: float = 0.5,
+        capacidad_cola: int = 10_000,
+        max_reintentos: int = 5,
+    ) -> None:
+        if tamano_lote <= 0:
+            raise ValueError("El tamaño de lote debe ser positivo.")
+        if intervalo <= 0:
+            raise ValueError("El intervalo de volcado debe ser positivo.")
+        if capacidad_cola <= 0:
+            raise ValueError("La capacidad de la cola debe ser positiva.")
+        if max_reintentos < 0:
+            raise ValueError("El número de reintentos no puede ser negativo.")
+        self.ruta = Path(ruta)
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.max_reintentos = max_reintentos
+        self._cola: queue.Queue = queue.Queue(maxsize=capacidad_cola)
+        self._bloqueo = threading.Lock()
+        self._cerrado = False
+        self._bloqueo_cierre = threading.Lock()
+        self._ultimo_error: Optional[BaseException] = None
+        self._descartadas: List[MutacionDescartada] = []
+        self._hilo = threading.Thread(
+            target=self._bucle, name="EventStoreWriteBehind", daemon=True
+        )
+        self._hilo.start()
+
+    def guardar_evento(self, evento: Evento, timeout: float | None = None) -> "Future[int]":
+        """Encola la inserción de un evento nuevo (se guarda una copia).
+
+        El ``Future`` devuelto se resuelve con el id asignado tras el volcado, o
+        con una excepción si la mutación se descarta.
+        """
+
+        copia = type(evento).desde_dict(evento.to_dict())
+        futuro: "Future[int]" = Future()
+        self._encolar(_Mutacion("evento", (copia, futuro)), timeout)
+        return futuro
+
+    def registrar_asistentes(
+        self, evento: ReferenciaEvento, cantidad: int, timeout: float | None = None
+    ) -> None:
+        """Encola un cambio de asistentes para un id o un ``Future`` de ``guardar_evento``."""
+
+        if not isinstance(evento, Future):
+            evento = int(evento)
+        self._encolar(_Mutacion("asistentes", (evento, int(cantidad))), timeout)
+
+    def actualizar_ciudad(self, ciudad: Ciudad, timeout: float | None = None) -> None:
+        """Encola la inserción o actualización de una ciudad."""
+
+        copia = Ciudad.desde_dict(ciudad.to_dict())
+        self._encolar(_Mutacion("ciudad", copia), timeout)
+
+    def descartadas(self) -> List[MutacionDescartada]:
+        """Devuelve una copia de las mutaciones rechazadas o abandonadas."""
+
+        with self._bloqueo:
+            return list(self._descartadas)
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Bloquea hasta que todo lo encolado previamente esté escrito en la base."""
+
+        senal = _Senal()
+        self._encolar(senal, timeout)
+        self._esperar(senal, timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Vuelca las mutaciones pendientes y detiene el hilo de fondo.
+
+        Si la señal de cierre no cabe en la cola antes de ``timeout`` se lanza
+        ``TimeoutError`` y el almacén sigue abierto, de modo que puede reintentarse.
+        """
+
+        with self._bloqueo_cierre:
+            if self._cerrado:
+                return
+            if not self._hilo.is_alive():
+                with self._bloqueo:
+                    self._cerrado = True
+                self._lanzar_si_caido()
+            senal = _Senal(cerrar=True)
+            self._poner(senal, timeout)
+            with self._bloqueo:
+                self._cerrado = True
+        self._esperar(senal, timeout)
+        self._hilo.join(timeout)
+
+    def __enter__(self) -> "EventStoreWriteBehind":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _lanzar_si_caido(self) -> None:
+        if not self._hilo.is_alive():
+            raise RuntimeError(
+                "El hilo de escritura diferida se detuvo."
+            ) from self._ultimo_error
+
+    def _encolar(self, item: Any, timeout: float | None) -> None:
+        with self._bloqueo:
+            if self._cerrado:
+                raise RuntimeError("El almacén de escritura diferida ya fue cerrado.")
+        self._poner(item, timeout)
+
+    def _poner(self, item: Any, timeout: float | None) -> None:
+        # Se sondea en lugar de bloquear indefinidamente para detectar si el hilo
+        # de fondo murió mientras el productor espera espacio en la cola.
+        limite = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            self._lanzar_si_caido()
+            espera = _ESPERA_SONDEO
+            if limite is not None:
+                espera = min(espera, limite - time.monotonic())
+                if espera <= 0:
+                    raise TimeoutError("La cola de escritura diferida está llena.")
+            try:
+                self._cola.put(item, timeout=espera)
+                return
+            except queue.Full:
+                continue
+
+    def _esperar(self, senal: _Senal, timeout: float | None) -> None:
+        limite = time.monotonic() + timeout if timeout is not None else None
+        while not senal.listo.wait(_ESPERA_SONDEO):
+            if not self._hilo.is_alive() and not senal.listo.is_set():
+                self._lanzar_si_caido()
+            if limite is not None and time.monotonic() >= limite:
+                raise TimeoutError("El volcado a la base de datos no terminó a tiempo.")
+        if senal.error is not None:
+            raise RuntimeError(
+                "No fue posible volcar los cambios a la base de datos."
+            ) from senal.error
+
+    def _bucle(self) -> None:
+        try:
+            conn = sqlite3.connect(self.ruta)
+        except Exception as exc:  # noqa: BLE001 - se expone en flush()/close()
+            self._ultimo_error = exc
+            return
+        try:
+            self._procesar(conn)
+        except Exception as exc:  # noqa: BLE001 - se expone en flush()/close()
+            self._ultimo_error = exc
+        finally:
+            conn.close()
+
+    def _procesar(self, conn: sqlite3.Connection) -> None:
+        pendientes: List[_Mutacion] = []
+        fallos = 0
+        limite = 0.0
+        while True:
+            espera = max(0.0, limite - time.monotonic()) if pendientes else None
+            try:
+                item = self._cola.get(timeout=espera)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, _Senal):
+                if not self._volcar(conn, pendientes):
+                    item.error = self._ultimo_error
+                    fallos += 1
+                    if item.cerrar or fallos > self.max_reintentos:
+                        self._descartar(pendientes)
+                        fallos = 0
+                else:
+                    fallos = 0
+                if item.cerrar:
+                    self._descartar_tardias()
+                item.listo.set()
+                if item.cerrar:
+                    return
+                continue
+
+            if item is not None:
+                if not pendientes:
+                    limite = time.monotonic() + self.intervalo
+                pendientes.append(item)
+                # Mientras se espera para reintentar, solo el plazo dispara el volcado.
+                if len(pendientes) < self.tamano_lote or fallos:
+                    continue
+            elif not pendientes:
+                continue
+
+            if self._volcar(conn, pendientes):
+                fallos = 0
+                continue
+            fallos += 1
+            if fallos > self.max_reintentos:
+                self._descartar(pendientes)
+                fallos = 0
+            else:
+                limite = time.monotonic() + self.intervalo
+
+    def _registrar_descartes(self, mutaciones: List[_Mutacion], motivo: str) -> None:
+        descartadas = []
+        for mutacion in mutaciones:
+            datos = mutacion.datos
+            if mutacion.tipo == "evento":
+                datos, futuro = mutacion.datos
+                if not futuro.done():
+                    futuro.set_exception(RuntimeError(motivo))
+            elif mutacion.tipo == "asistentes":
+                datos = (_resolver_referencia(datos[0], {}), datos[1])
+            descartadas.append(MutacionDescartada(mutacion.tipo, datos, motivo))
+        with self._bloqueo:
+            self._descartadas.extend(descartadas)
+
+    def _descartar(self, pendientes: List[_Mutacion]) -> None:
+        self._registrar_descartes(
+            pendientes, f"Lote abandonado tras reintentos: {self._ultimo_error}"
+        )
+        pendientes.clear()
+
+    def _descartar_tardias(self) -> None:
+        while True:
+            try:
+                item = self._cola.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, _Senal):
+                item.error = RuntimeError("El almacén de escritura diferida ya fue cerrado.")
+                item.listo.set()
+            else:
+                self._registrar_descartes([item], "Encolada durante el cierre.")
+
+    def _volcar(self, conn: sqlite3.Connection, pendientes: List[_Mutacion]) -> bool:
+        if not pendientes:
+            return True
+        try:
+            rechazadas = self._aplicar(conn, pendientes)
+        except Exception as exc:  # noqa: BLE001 - el lote se conserva para reintentar
+            self._ultimo_error = exc
+            return False
+        if rechazadas:
+            with self._bloqueo:
+                self._descartadas.extend(rechazadas)
+        pendientes.clear()
+        self._ultimo_error = None
+        return True
+
+    @staticmethod
+    def _aplicar(
+        conn: sqlite3.Connection, pendientes: List[_Mutacion]
+    ) -> List[MutacionDescartada]:
+        # El estado final de cada ciudad es el de su última mutación, ya venga de
+        # una actualización explícita o de un evento nuevo que la referencia.
+        ciudades: Dict[Tuple[str, str], Ciudad] = {}
+        nuevos: List[Tuple[Evento, "Future[int]"]] = []
+        deltas: List[Tuple[ReferenciaEvento, int]] = []
+        for mutacion in pendientes:
+            if mutacion.tipo == "ciudad":
+                ciudad = mutacion.datos
+                ciudades[(ciudad.nombre, ciudad.pais)] = ciudad
+            elif mutacion.tipo == "evento":
+                evento, futuro = mutacion.datos
+                nuevos.append((evento, futuro))
+                ciudades[(evento.ciudad.nombre, evento.ciudad.pais)] = evento.ciudad
+            else:
+                deltas.append(mutacion.datos)
+
+        rechazadas: List[MutacionDescartada] = []
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            ids_ciudad = {
+                clave: _obtener_id_ciudad(conn, ciudad) for clave, ciudad in ciudades.items()
+            }
+            ids_nuevos: Dict[int, int] = {}
+            for evento, futuro in nuevos:
+                ids_nuevos[id(futuro)] = _insertar_evento(
+                    conn, evento, ids_ciudad[(evento.ciudad.nombre, evento.ciudad.pais)]
+                )
+
+            deltas_resueltos = [
+                (_resolver_referencia(referencia, ids_nuevos), cantidad)
+                for referencia, cantidad in deltas
+            ]
+            estado = _leer_asistentes(
+                conn, {evento_id for evento_id, _ in deltas_resueltos if evento_id is not None}
+            )
+            modificados = set()
+            for evento_id, cantidad in deltas_resueltos:
+                if evento_id is None:
+                    motivo = "El evento referenciado no llegó a guardarse."
+                elif evento_id not in estado:
+                    motivo = "El evento no existe."
+                else:
+                    asistentes, capacidad = estado[evento_id]
+                    nueva_cantidad = asistentes + cantidad
+                    if 0 <= nueva_cantidad <= capacidad:
+                        estado[evento_id] = (nueva_cantidad, capacidad)
+                        modificados.add(evento_id)
+                        continue
+                    motivo = (
+                        "La cantidad de asistentes quedaría fuera del rango "
+                        f"0..{capacidad} (actual {asistentes}, cambio {cantidad})."
+                    )
+                rechazadas.append(
+                    MutacionDescartada("asistentes", (evento_id, cantidad), motivo)
+                )
+            conn.executemany(
+                "UPDATE eventos SET asistentes_registrados = ? WHERE id = ?;",
+                [(estado[evento_id][0], evento_id) for evento_id in modificados],
+            )
+        # Los ids solo se publican cuando la transacción ya está confirmada.
+        for evento, futuro in nuevos:
+            if not futuro.done():
+                futuro.set_result(ids_nuevos[id(futuro)])
+        return rechazadas
+
+
+def _resolver_referencia(
+    referencia: ReferenciaEvento, ids_nuevos: Dict[int, int]
+) -> Optional[int]:
+    if not isinstance(referencia, Future):
+        return referencia
+    if id(referencia) in ids_nuevos:
+        return ids_nuevos[id(referencia)]
+    if referencia.done() and not referencia.cancelled() and referencia.exception() is None:
+        return referencia.result()
+    return None
+
+
+def _leer_asistentes(
+    conn: sqlite3.Connection, ids: set, tamano_bloque: int = 500
+) -> Dict[int, Tuple[int, int]]:
+    ids_lista = sorted(ids)
+    estado: Dict[int, Tuple[int, int]] = {}
+    for inicio in range(0, len(ids_lista), tamano_bloque):
+        bloque = ids_lista[inicio:inicio + tamano_bloque]
+        marcadores = ", ".join("?" * len(bloque))
+        filas = conn.execute(
+            "SELECT id, asistentes_registrados, capacidad_maxima FROM eventos "
+            f"WHERE id IN ({marcadores})",
+            bloque,
+        )
+        estado.update({int(fila[0]): (int(fila[1]), int(fila[2])) for fila in filas})
+    return estado
+
+
+__all__ = ["EventStoreWriteBehind", "MutacionDescartada"]
@@ -0,0 +1,93 @@
+"""Prueba de carga del servicio HTTP de consultas contra localhost."""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from gestor_eventos import RUTA_DB, listar_eventos_db
+from gestor_eventos.forecast import CachePronosticos, PlanificadorPronosticos
+from gestor_eventos.server import crear_servidor
+
+RUTAS = ["/eventos", "/resumen", "/eventos?ciudad=Bogotá", "/clima"]
+
+
+def _peticion(url: str) -> tuple[float, str | None]:
+    """Devuelve la latencia y, si la petición falló, una descripción del error."""
+
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:  # nosec B310
+            response.read()
+        error = None
+    except urllib.error.HTTPError as exc:
+        error = f"HTTP {exc.code}"
+    except (urllib.error.URLError, http.client.HTTPException, OSError) as exc:
+        error = exc.__class__.__name__
+    return time.perf_counter() - inicio, error
+
+
+def _percentil(valores: list[float], percentil: float) -> float:
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(percentil / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="URL base de un servicio ya en ejecución.")
+    parser.add_argument("--db", default=str(RUTA_DB))
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    args = parser.parse_args()
+
+    servidor = None
+    planificador = None
+    base = args.url
+    if base is None:
+        cache = CachePronosticos()
+        planificador = PlanificadorPronosticos(cache)
+        planificador.iniciar(lambda: listar_eventos_db(args.db))
+        servidor = crear_servidor(puerto=0, ruta=args.db, cache_pronosticos=cache)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    urls = [
+        urllib.parse.quote(f"{base}{RUTAS[i % len(RUTAS)]}", safe=":/?=&")
+        for i in range(args.peticiones)
+    ]
+    try:
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrencia) as executor:
+            resultados = list(executor.map(_peticion, urls))
+        duracion = time.perf_counter() - inicio
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+            servidor.server_close()
+        if planificador is not None:
+            planificador.detener(timeout=5)
+
+    latencias = [latencia for latencia, error in resultados if error is None]
+    errores = Counter(error for _, error in resultados if error is not None)
+
+    print(f"Peticiones: {len(resultados)} en {duracion:.2f} s")
+    print(f"Peticiones/seg: {len(resultados) / duracion:.1f}")
+    detalle = ", ".join(f"{error}: {cantidad}" for error, cantidad in errores.most_common())
+    print(f"Errores: {sum(errores.values())}" + (f" ({detalle})" if detalle else ""))
+    if latencias:
+        print(f"Latencia p50: {_percentil(latencias, 50) * 1000:.2f} ms")
+        print(f"Latencia p99: {_percentil(latencias, 99) * 1000:.2f} ms")
+    else:
+        print("Sin respuestas correctas para calcular latencias.")
+
+
+if __name__ == "__main__":
+    main()
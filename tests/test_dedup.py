@@ -0,0 +1,103 @@
+"""Pruebas para la deduplicación de ciudades y eventos."""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from gestor_eventos.dedup import (
+    _distancia_km,
+    agrupar_ciudades,
+    deduplicar_db,
+    geohash,
+    normalizar_texto,
+)
+from gestor_eventos.models import Ciudad, Evento
+from gestor_eventos.processing import resumen_asistentes
+from gestor_eventos.storage import (
+    guardar_evento_en_db,
+    inicializar_db,
+    listar_ciudades_db,
+    listar_eventos_db,
+)
+
+
+class TestNormalizacion(unittest.TestCase):
+    def test_normaliza_acentos_y_espacios(self) -> None:
+        self.assertEqual(normalizar_texto("  Bogotá   D.C. "), "bogota d.c.")
+
+    def test_geohash_conocido(self) -> None:
+        self.assertEqual(geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+
+
+class TestAgruparCiudades(unittest.TestCase):
+    def test_fusiona_por_nombre_o_cercania_pero_no_homonimos_lejanos(self) -> None:
+        registros = [
+            (1, "Bogotá", "Colombia", 4.7110, -74.0721),
+            (2, "Bogota", "Colombia", 4.6500, -74.1000),
+            (3, "Santa Fe De Bogota", "Colombia", 4.71101, -74.07211),
+            (4, "San José", "Costa Rica", 9.93, -84.08),
+            (5, "San Jose", "Costa Rica", 10.63, -85.44),
+        ]
+        self.assertEqual(agrupar_ciudades(registros), {2: 1, 3: 1})
+
+    def test_fusiona_puntos_cercanos_a_ambos_lados_del_borde_de_celda(self) -> None:
+        alto_celda = 180.0 / 2 ** 17  # alto en grados de una celda de geohash de precisión 7
+        borde = (int((4.711 + 90) / alto_celda) + 1) * alto_celda - 90
+        registros = [
+            (1, "Bogotá", "Colombia", borde - 0.00001, -74.07),
+            (2, "Santa Fe", "Colombia", borde + 0.00001, -74.07),
+            (3, "Chapinero", "Colombia", borde + 0.01, -74.07),
+        ]
+        self.assertNotEqual(geohash(*registros[0][3:]), geohash(*registros[1][3:]))
+        self.assertEqual(agrupar_ciudades(registros), {2: 1})
+
+    def test_homonimos_dispersos_no_se_comparan_todos_contra_todos(self) -> None:
+        registros = [
+            (i, "Unknown", "Colombia", -60 + (i // 360) * 1.0, -180 + (i % 360) * 1.0)
+            for i in range(5000)
+        ]
+        with mock.patch("gestor_eventos.dedup._distancia_km", wraps=_distancia_km) as distancia:
+            self.assertEqual(agrupar_ciudades(registros), {})
+        self.assertLess(distancia.call_count, 20 * len(registros))
+
+
+class TestDeduplicarDb(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.ruta = Path(self._tmp.name) / "eventos.db"
+        inicializar_db(self.ruta)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_fusiona_ciudades_y_eventos(self) -> None:
+        bogota = Ciudad("Bogotá", "Colombia", 4.711, -74.072)
+        bogota_feed = Ciudad("Bogota", "Colombia", 4.7111, -74.0721)
+        lima = Ciudad("Lima", "Perú", -12.04, -77.03)
+        for titulo, fecha, ciudad, capacidad, asistentes in [
+            ("Congreso IA", datetime(2030, 3, 1, 9), bogota, 100, 40),
+            ("congreso  ia", datetime(2030, 3, 1, 15), bogota_feed, 120, 60),
+            ("Congreso IA", datetime(2030, 3, 2, 9), bogota, 100, 10),
+            ("Congreso IA", datetime(2030, 3, 1, 9), lima, 50, 5),
+        ]:
+            evento = Evento(titulo, fecha, ciudad, capacidad, asistentes_registrados=asistentes)
+            guardar_evento_en_db(evento, self.ruta)
+
+        informe = deduplicar_db(self.ruta)
+
+        self.assertEqual(informe.ciudades_fusionadas, {1: [2]})
+        self.assertEqual(informe.eventos_fusionados, {1: [2]})
+        self.assertEqual(len(listar_ciudades_db(self.ruta)), 2)
+        eventos = listar_eventos_db(self.ruta)
+        self.assertEqual(len(eventos), 3)
+        self.assertEqual(resumen_asistentes(eventos)["total_asistentes"], 75)
+        fusionado = eventos[0]
+        self.assertEqual((fusionado.capacidad_maxima, fusionado.asistentes_registrados), (120, 60))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
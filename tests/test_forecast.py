@@ -0,0 +1,130 @@
+"""Pruebas para la precarga de pronósticos del clima."""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+import unittest
+import urllib.error
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from gestor_eventos.forecast import PlanificadorPronosticos, necesidades_pronostico
+from gestor_eventos.models import Ciudad, Evento
+
+
+class RelojFalso:
+    def __init__(self) -> None:
+        self.ahora = 0.0
+        self.esperas: List[float] = []
+
+    def __call__(self) -> float:
+        return self.ahora
+
+    def dormir(self, segundos: float) -> None:
+        self.esperas.append(segundos)
+        self.ahora += segundos
+
+
+class TestPrecargaPronosticos(unittest.TestCase):
+    def setUp(self) -> None:
+        self.ahora = datetime(2030, 5, 1, 9, 0)
+        self.quito = Ciudad("Quito", "Ecuador", -0.18, -78.46)
+        self.lima = Ciudad("Lima", "Perú", -12.04, -77.03)
+        self.eventos = [
+            Evento("A", self.ahora + timedelta(days=5), self.quito, 10),
+            Evento("B", self.ahora + timedelta(days=5, hours=3), self.quito, 10),
+            Evento("C", self.ahora + timedelta(days=2), self.lima, 10),
+            Evento("Pasado", self.ahora - timedelta(days=1), self.lima, 10),
+            Evento("Lejano", self.ahora + timedelta(days=60), self.lima, 10),
+        ]
+        self.urls: List[str] = []
+
+    def _transporte(self, url: str, timeout: float) -> Dict:
+        self.urls.append(url)
+        return {
+            "daily": {
+                "temperature_2m_max": [20.0],
+                "temperature_2m_min": [10.0],
+                "precipitation_sum": [1.5],
+                "windspeed_10m_max": [12.0],
+            }
+        }
+
+    def test_necesidades_distintas_y_ordenadas_por_cercania(self) -> None:
+        necesidades = necesidades_pronostico(self.eventos, self.ahora)
+        self.assertEqual(
+            [(c.nombre, f) for c, f in necesidades],
+            [("Lima", date(2030, 5, 3)), ("Quito", date(2030, 5, 6))],
+        )
+
+    def test_ciclo_limita_tasa_y_deja_lectura_local(self) -> None:
+        reloj = RelojFalso()
+        planificador = PlanificadorPronosticos(
+            transporte=self._transporte, max_por_segundo=2, reloj=reloj, dormir=reloj.dormir
+        )
+        self.assertEqual(planificador.ejecutar_ciclo(self.eventos, self.ahora), 2)
+        self.assertEqual(reloj.esperas, [0.5])
+        self.assertIn("start_date=2030-05-03", self.urls[0])
+
+        pronostico = planificador.cache.obtener(self.quito, self.ahora + timedelta(days=5))
+        self.assertEqual(pronostico["temperatura_max"], 20.0)
+
+        self.assertEqual(planificador.ejecutar_ciclo(self.eventos, self.ahora), 0)
+        self.assertEqual(len(self.urls), 2)
+        self.assertNotIn("obtenido", pronostico)
+
+    def test_poda_pronosticos_de_dias_pasados(self) -> None:
+        planificador = PlanificadorPronosticos(transporte=self._transporte, dormir=lambda s: None)
+        planificador.ejecutar_ciclo(self.eventos, self.ahora)
+        self.assertEqual(len(planificador.cache), 2)
+
+        planificador.ejecutar_ciclo([], self.ahora + timedelta(days=3))
+        self.assertEqual(len(planificador.cache), 1)
+        self.assertIsNone(planificador.cache.obtener(self.lima, date(2030, 5, 3)))
+
+    def test_horizonte_excluye_el_dia_dieciseis(self) -> None:
+        eventos = [
+            Evento("Borde", self.ahora + timedelta(days=15), self.quito, 10),
+            Evento("Fuera", self.ahora + timedelta(days=16), self.lima, 10),
+        ]
+        necesidades = necesidades_pronostico(eventos, self.ahora)
+        self.assertEqual([c.nombre for c, _ in necesidades], ["Quito"])
+
+    def test_errores_no_se_guardan(self) -> None:
+        errores = iter([urllib.error.URLError("sin red"), ConnectionResetError("reset")])
+
+        def transporte_fallido(url: str, timeout: float):
+            try:
+                raise next(errores)
+            except StopIteration:
+                return ["no es un objeto"]
+
+        planificador = PlanificadorPronosticos(transporte=transporte_fallido, dormir=lambda s: None)
+        with self.assertLogs("gestor_eventos.forecast", "WARNING"):
+            for _ in range(3):
+                self.assertEqual(planificador.ejecutar_ciclo(self.eventos, self.ahora), 0)
+        self.assertEqual(len(planificador.cache), 0)
+
+    def test_hilo_sobrevive_a_fallos_del_proveedor(self) -> None:
+        llamadas = []
+
+        def proveedor():
+            llamadas.append(1)
+            if len(llamadas) == 1:
+                raise sqlite3.OperationalError("no such table: eventos")
+            return self.eventos
+
+        planificador = PlanificadorPronosticos(transporte=self._transporte, max_por_segundo=1000)
+        with self.assertLogs("gestor_eventos.forecast", "ERROR"):
+            planificador.iniciar(proveedor, periodo=0.01)
+            for _ in range(100):
+                if len(llamadas) >= 2:
+                    break
+                time.sleep(0.01)
+        planificador.detener(timeout=2)
+        self.assertGreaterEqual(len(llamadas), 2)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,130 @@
+"""Pruebas para el servicio HTTP de consultas."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from gestor_eventos.forecast import CachePronosticos, PlanificadorPronosticos
+from gestor_eventos.models import Ciudad, Evento
+from gestor_eventos.server import crear_servidor
+from gestor_eventos.storage import guardar_evento_en_db, inicializar_db, listar_eventos_db
+
+
+class TestServidorConsultas(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.ruta = Path(self._tmp.name) / "eventos.db"
+        inicializar_db(self.ruta)
+        self.quito = Ciudad("Quito", "Ecuador", -0.18, -78.46)
+        self.lima = Ciudad("Lima", "Perú", -12.04, -77.03)
+        for evento in [
+            Evento("A", datetime(2030, 1, 1), self.quito, 100, asistentes_registrados=10),
+            Evento("B", datetime(2030, 2, 1), self.lima, 50, asistentes_registrados=5),
+        ]:
+            guardar_evento_en_db(evento, self.ruta)
+
+        self.cache = CachePronosticos()
+        self.servidor = self._arrancar(self.ruta, self.cache)
+        self.base = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _arrancar(self, ruta: Path, cache: CachePronosticos | None = None):
+        servidor = crear_servidor(puerto=0, ruta=ruta, cache_pronosticos=cache)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        return servidor
+
+    def _get(self, ruta: str, etag: str | None = None, base: str | None = None):
+        peticion = urllib.request.Request((base or self.base) + ruta)
+        if etag:
+            peticion.add_header("If-None-Match", etag)
+        try:
+            with urllib.request.urlopen(peticion, timeout=5) as response:
+                cuerpo = json.loads(response.read())
+                return response.status, response.headers.get("ETag"), cuerpo
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.headers.get("ETag"), json.loads(exc.read() or b"null")
+
+    def test_lista_con_filtros_y_resumen(self) -> None:
+        estado, _, eventos = self._get("/eventos?ciudad=lima")
+        self.assertEqual(estado, 200)
+        self.assertEqual([e["titulo"] for e in eventos], ["B"])
+
+        _, _, resumen = self._get("/resumen?hasta=2030-01-15")
+        self.assertEqual(resumen["total_asistentes"], 10)
+
+        estado, _, _ = self._get("/eventos?desde=ayer")
+        self.assertEqual(estado, 400)
+
+    def test_etag_y_invalidacion_al_cambiar_la_base(self) -> None:
+        _, etag, resumen = self._get("/resumen")
+        self.assertEqual(resumen["total_eventos"], 2)
+        estado, _, _ = self._get("/resumen", etag)
+        self.assertEqual(estado, 304)
+
+        guardar_evento_en_db(Evento("C", datetime(2030, 3, 1), self.quito, 10), self.ruta)
+
+        estado, nuevo_etag, resumen = self._get("/resumen", etag)
+        self.assertEqual(estado, 200)
+        self.assertNotEqual(nuevo_etag, etag)
+        self.assertEqual(resumen["total_eventos"], 3)
+
+    def test_clima_lee_pronosticos_precargados(self) -> None:
+        manana = datetime.now() + timedelta(days=1)
+        guardar_evento_en_db(Evento("Próximo", manana, self.quito, 10), self.ruta)
+
+        def transporte(url: str, timeout: float):
+            return {"daily": {"temperature_2m_max": [21.5]}}
+
+        planificador = PlanificadorPronosticos(self.cache, transporte=transporte)
+        self.assertEqual(planificador.ejecutar_ciclo(listar_eventos_db(self.ruta)), 1)
+
+        estado, etag, clima = self._get("/clima?ciudad=quito")
+        self.assertEqual(estado, 200)
+        self.assertIsNotNone(etag)
+        pronosticos = {c["titulo"]: c["pronostico"] for c in clima}
+        self.assertIsNone(pronosticos["A"])
+        self.assertEqual(pronosticos["Próximo"]["temperatura_max"], 21.5)
+
+    def test_parametros_desconocidos_no_crecen_la_cache(self) -> None:
+        servicio = self.servidor.RequestHandlerClass.servicio
+        for i in range(5):
+            self._get(f"/eventos?ciudad=quito&x={i}")
+        self.assertEqual(len(servicio._respuestas), 1)
+
+    def test_recarga_si_el_archivo_de_la_base_se_reemplaza(self) -> None:
+        _, _, eventos = self._get("/eventos")
+        self.assertEqual([e["titulo"] for e in eventos], ["A", "B"])
+
+        self.ruta.unlink()
+        inicializar_db(self.ruta)
+        for titulo in ("X", "Y", "Z"):
+            guardar_evento_en_db(Evento(titulo, datetime(2031, 1, 1), self.lima, 10), self.ruta)
+
+        _, _, eventos = self._get("/eventos")
+        self.assertEqual(sorted(e["titulo"] for e in eventos), ["X", "Y", "Z"])
+
+    def test_errores_internos_responden_500(self) -> None:
+        sin_tablas = Path(self._tmp.name) / "sin_tablas.db"
+        sqlite3.connect(sin_tablas).close()
+        servidor = self._arrancar(sin_tablas)
+        base = f"http://127.0.0.1:{servidor.server_address[1]}"
+        with self.assertLogs("gestor_eventos.server", "ERROR"):
+            estado, _, cuerpo = self._get("/eventos", base=base)
+        self.assertEqual(estado, 500)
+        self.assertIn("error", cuerpo)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Pruebas para la consulta resiliente del clima."""
+
+from __future__ import annotations
+
+import io
+import json
+import threading
+import time
+import unittest
+import urllib.error
+from unittest import mock
+
+from gestor_eventos import weather
+from gestor_eventos.models import Ciudad
+from gestor_eventos.weather import InterruptorCircuito, consultar_clima_ciudades
+
+
+def _respuesta(temperatura: float) -> io.BytesIO:
+    cuerpo = {"current_weather": {"temperature": temperatura, "windspeed": 5, "time": "t"}}
+    return io.BytesIO(json.dumps(cuerpo).encode("utf-8"))
+
+
+class TestInterruptorCircuito(unittest.TestCase):
+    def test_abre_tras_fallos_y_prueba_recuperacion(self) -> None:
+        ahora = [0.0]
+        interruptor = InterruptorCircuito(
+            umbral_fallos=2, tiempo_recuperacion=10, reloj=lambda: ahora[0]
+        )
+        interruptor.registrar_fallo()
+        self.assertTrue(interruptor.permitir())
+        interruptor.registrar_fallo()
+        self.assertFalse(interruptor.permitir())
+
+        ahora[0] = 10.0
+        self.assertTrue(interruptor.permitir())
+        self.assertFalse(interruptor.permitir())
+        interruptor.registrar_exito()
+        self.assertEqual(interruptor.estado, InterruptorCircuito.CERRADO)
+
+
+class TestConsultaClima(unittest.TestCase):
+    def setUp(self) -> None:
+        parche = mock.patch.object(weather, "_interruptor", InterruptorCircuito(umbral_fallos=2))
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.quito = Ciudad("Quito", "Ecuador", -0.18, -78.46)
+        self.lima = Ciudad("Lima", "Perú", -12.04, -77.03)
+
+    def test_circuito_abierto_falla_sin_llamar_a_la_red(self) -> None:
+        error = urllib.error.URLError("caído")
+        with mock.patch("urllib.request.urlopen", side_effect=error) as urlopen:
+            for _ in range(4):
+                resultado = weather._consultar_ciudad(self.quito)
+        self.assertEqual(urlopen.call_count, 2)
+        self.assertIn("circuito abierto", resultado["error"])
+
+    def test_prueba_fallida_con_error_no_envuelto_reabre_el_circuito(self) -> None:
+        ahora = [0.0]
+        interruptor = InterruptorCircuito(
+            umbral_fallos=1, tiempo_recuperacion=10, reloj=lambda: ahora[0]
+        )
+        with mock.patch.object(weather, "_interruptor", interruptor):
+            with mock.patch("urllib.request.urlopen", side_effect=ConnectionResetError("reset")):
+                self.assertIn("error", weather._consultar_ciudad(self.quito))
+                ahora[0] = 10.0
+                resultado = consultar_clima_ciudades([self.quito])
+            self.assertIn("reset", resultado["Quito|Ecuador"]["error"])
+            self.assertEqual(interruptor.estado, InterruptorCircuito.ABIERTO)
+
+            ahora[0] = 20.0
+            with mock.patch("urllib.request.urlopen", return_value=_respuesta(15.0)):
+                self.assertEqual(weather._consultar_ciudad(self.quito)["temperatura"], 15.0)
+            self.assertEqual(interruptor.estado, InterruptorCircuito.CERRADO)
+
+    def test_errores_de_cliente_y_cuerpos_invalidos_no_abren_el_circuito(self) -> None:
+        error_400 = urllib.error.HTTPError("url", 400, "Bad Request", {}, None)
+        with mock.patch("urllib.request.urlopen", side_effect=error_400):
+            for _ in range(3):
+                self.assertIn("error", weather._consultar_ciudad(self.quito))
+        with mock.patch("urllib.request.urlopen", return_value=io.BytesIO(b"[1, 2]")):
+            for _ in range(3):
+                self.assertIn("error", weather._consultar_ciudad(self.quito))
+        self.assertEqual(weather._interruptor.estado, InterruptorCircuito.CERRADO)
+
+    def test_agrupa_consultas_identicas_en_curso(self) -> None:
+        llamadas = []
+
+        def urlopen_lento(url, timeout):
+            llamadas.append(url)
+            time.sleep(0.2)
+            return _respuesta(18.0)
+
+        resultados = []
+
+        def consultar() -> None:
+            resultados.append(weather._consultar_ciudad(self.quito))
+
+        with mock.patch("urllib.request.urlopen", side_effect=urlopen_lento):
+            hilos = [threading.Thread(target=consultar) for _ in range(5)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual([r["temperatura"] for r in resultados], [18.0] * 5)
+
+    def test_presupuesto_total_del_lote(self) -> None:
+        def urlopen_colgado(url, timeout):
+            time.sleep(min(timeout, 2.0))
+            raise TimeoutError("timed out")
+
+        inicio = time.monotonic()
+        with mock.patch("urllib.request.urlopen", side_effect=urlopen_colgado):
+            resultados = consultar_clima_ciudades([self.quito, self.lima], presupuesto=0.2)
+        self.assertLess(time.monotonic() - inicio, 1.0)
+        self.assertEqual(set(resultados), {"Quito|Ecuador", "Lima|Perú"})
+        self.assertTrue(all("error" in r for r in resultados.values()))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,174 @@
+"""Pruebas para el almacén de eventos con escritura diferida."""
+
+from __future__ import annotations
+
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from gestor_eventos.models import Ciudad, Evento
+from gestor_eventos.storage import (
+    guardar_evento_en_db,
+    inicializar_db,
+    listar_eventos_con_id_db,
+    listar_eventos_db,
+)
+from gestor_eventos.write_behind import EventStoreWriteBehind
+
+
+class TestEventStoreWriteBehind(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.ruta = Path(self._tmp.name) / "eventos.db"
+        inicializar_db(self.ruta)
+        self.ciudad = Ciudad("Quito", "Ecuador", -0.18, -78.46)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _asistentes(self, evento_id: int) -> int:
+        conn = sqlite3.connect(self.ruta)
+        try:
+            row = conn.execute(
+                "SELECT asistentes_registrados FROM eventos WHERE id = ?", (evento_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return int(row[0])
+
+    def test_agrupa_deltas_y_vuelca_en_flush(self) -> None:
+        evento = Evento("Evento", datetime(2030, 1, 1), self.ciudad, 100)
+        evento_id = guardar_evento_en_db(evento, self.ruta)
+        almacen = EventStoreWriteBehind(self.ruta, intervalo=60)
+        try:
+            for _ in range(10):
+                almacen.registrar_asistentes(evento_id, 3)
+            almacen.registrar_asistentes(evento_id, -5)
+            self.assertEqual(self._asistentes(evento_id), 0)
+            almacen.flush()
+            self.assertEqual(self._asistentes(evento_id), 25)
+        finally:
+            almacen.close()
+
+    def test_close_guarda_eventos_y_ciudades_en_orden(self) -> None:
+        with EventStoreWriteBehind(self.ruta, intervalo=60) as almacen:
+            evento = Evento("Nuevo", datetime(2030, 2, 1), self.ciudad, 50)
+            almacen.guardar_evento(evento)
+            evento.registrar_asistentes(10)
+            actualizada = Ciudad("Quito", "Ecuador", -0.18, -78.46, _descripcion="capital")
+            almacen.actualizar_ciudad(actualizada)
+
+        eventos = listar_eventos_db(self.ruta)
+        self.assertEqual(len(eventos), 1)
+        self.assertEqual(eventos[0].asistentes_registrados, 0)
+        self.assertEqual(eventos[0].ciudad.descripcion, "capital")
+
+    def test_vuelca_al_alcanzar_tamano_de_lote(self) -> None:
+        evento_id = guardar_evento_en_db(
+            Evento("Evento", datetime(2030, 1, 1), self.ciudad, 100), self.ruta
+        )
+        almacen = EventStoreWriteBehind(self.ruta, tamano_lote=2, intervalo=60)
+        try:
+            almacen.registrar_asistentes(evento_id, 1)
+            almacen.registrar_asistentes(evento_id, 1)
+            for _ in range(100):
+                if self._asistentes(evento_id) == 2:
+                    break
+                time.sleep(0.02)
+            self.assertEqual(self._asistentes(evento_id), 2)
+        finally:
+            almacen.close()
+
+    def test_deltas_en_orden_y_rechazo_de_invalidos(self) -> None:
+        evento_id = guardar_evento_en_db(
+            Evento("Evento", datetime(2030, 1, 1), self.ciudad, 100), self.ruta
+        )
+        with EventStoreWriteBehind(self.ruta, intervalo=60) as almacen:
+            almacen.registrar_asistentes(evento_id, 100)
+            almacen.registrar_asistentes(evento_id, -50)
+            almacen.registrar_asistentes(evento_id, 60)
+            almacen.registrar_asistentes(evento_id + 99, 1)
+            almacen.flush()
+            descartadas = almacen.descartadas()
+
+        self.assertEqual(self._asistentes(evento_id), 50)
+        self.assertEqual(
+            [d.datos for d in descartadas], [(evento_id, 60), (evento_id + 99, 1)]
+        )
+
+    def test_error_de_escritura_se_propaga_y_el_lote_se_descarta(self) -> None:
+        sin_tablas = Path(self._tmp.name) / "vacia.db"
+        almacen = EventStoreWriteBehind(sin_tablas, intervalo=0.01, max_reintentos=1)
+        almacen.registrar_asistentes(1, 1)
+        with self.assertRaises(RuntimeError) as contexto:
+            almacen.flush(timeout=2)
+        self.assertIsInstance(contexto.exception.__cause__, sqlite3.OperationalError)
+        for _ in range(100):
+            if almacen.descartadas():
+                break
+            time.sleep(0.02)
+        self.assertEqual(len(almacen.descartadas()), 1)
+        almacen.close(timeout=2)
+
+    def test_hilo_caido_no_bloquea_flush_ni_close(self) -> None:
+        almacen = EventStoreWriteBehind(Path(self._tmp.name) / "no" / "existe" / "x.db")
+        almacen._hilo.join(timeout=2)
+        with self.assertRaises(RuntimeError):
+            almacen.registrar_asistentes(1, 1)
+        with self.assertRaises(RuntimeError):
+            almacen.flush(timeout=2)
+        with self.assertRaises(RuntimeError):
+            almacen.close(timeout=2)
+
+    def test_deltas_sobre_evento_encolado_y_evento_leido_de_la_base(self) -> None:
+        guardar_evento_en_db(Evento("Previo", datetime(2030, 1, 1), self.ciudad, 30), self.ruta)
+        [(previo_id, _)] = listar_eventos_con_id_db(self.ruta)
+
+        with EventStoreWriteBehind(self.ruta, intervalo=60) as almacen:
+            futuro = almacen.guardar_evento(
+                Evento("Nuevo", datetime(2030, 2, 1), self.ciudad, 50)
+            )
+            almacen.registrar_asistentes(futuro, 20)
+            almacen.registrar_asistentes(futuro, -5)
+            almacen.registrar_asistentes(previo_id, 7)
+            almacen.flush()
+            nuevo_id = futuro.result(timeout=1)
+            almacen.registrar_asistentes(futuro, 1)
+
+        self.assertEqual(self._asistentes(nuevo_id), 16)
+        self.assertEqual(self._asistentes(previo_id), 7)
+
+    def test_close_con_cola_llena_puede_reintentarse(self) -> None:
+        liberar = threading.Event()
+
+        def aplicar_bloqueado(conn, pendientes):
+            liberar.wait(5)
+            return []
+
+        with mock.patch.object(
+            EventStoreWriteBehind, "_aplicar", staticmethod(aplicar_bloqueado)
+        ):
+            almacen = EventStoreWriteBehind(self.ruta, tamano_lote=1, capacidad_cola=1)
+            almacen.registrar_asistentes(1, 1)
+            time.sleep(0.1)
+            almacen.registrar_asistentes(1, 1)
+            with self.assertRaises(TimeoutError):
+                almacen.close(timeout=0.2)
+            liberar.set()
+            almacen.close(timeout=2)
+        self.assertFalse(almacen._hilo.is_alive())
+
+    def test_rechaza_mutaciones_despues_de_cerrar(self) -> None:
+        almacen = EventStoreWriteBehind(self.ruta)
+        almacen.close()
+        with self.assertRaises(RuntimeError):
+            almacen.registrar_asistentes(1, 1)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()